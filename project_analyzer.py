@@ -1,13 +1,24 @@
 import os
+import ast
+import mmap
+import time
+import random
 import logging
-import json
+import hashlib
+import functools
+import sqlite3
 import requests
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 from datetime import datetime
 
 import gradio as gr
+import orjson
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # -------------------------------------------------------------------
 # Logging Setup
@@ -24,13 +35,128 @@ EXCLUSION_LIST = [
     ".git", ".venv", "node_modules", "__pycache__", ".DS_Store",
     "pb_data", "pb_public", "migrations"
 ]
+EXCLUDED_SET = frozenset(EXCLUSION_LIST)
+
+# Default upper bound on in-flight Watsonx requests during analysis;
+# override with MAX_WORKERS in the environment / .env
+MAX_CONCURRENT_REQUESTS = 10
+
+# Recorded in the findings when a Watsonx call fails; never cached or
+# handed on as a real summary
+NO_RESPONSE = "No response received."
+
+# Small files are packed together into one prompt up to this many
+# (estimated) tokens
+BATCH_MAX_PROMPT_TOKENS = 6000
+
+# IAM tokens live ~60 minutes. The IAM response says exactly when the token
+# expires; the TTL is only a fallback if it doesn't. Refresh this many
+# seconds before expiry so in-flight requests don't race the deadline.
+TOKEN_TTL_SECONDS = 3600
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# Files with these extensions are always read and summarized; anything
+# else (Makefile, Dockerfile, unknown suffixes) only if its first
+# BINARY_SNIFF_BYTES contain no NUL byte and decode as UTF-8
+SOURCE_EXTS = frozenset({
+    ".py", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt",
+    ".c", ".h", ".cpp", ".hpp", ".cs", ".swift", ".php", ".rb", ".sh",
+    ".html", ".css", ".scss", ".sql", ".md", ".txt", ".rst",
+    ".yaml", ".yml", ".toml", ".json", ".ini", ".cfg", ".xml"
+})
+BINARY_SNIFF_BYTES = 512
+
+# Files bigger than MAX_FILE_BYTES are only partially read from disk
+MAX_FILE_BYTES = 64 * 1024
+READ_HEAD_BYTES = 48 * 1024
+READ_TAIL_BYTES = 16 * 1024
+
+# Threads used to read a directory's files concurrently
+READ_WORKERS = 8
+
+# Write buffer for the summaries file and findings log, flushed at checkpoints
+SUMMARY_BUFFER_BYTES = 1 << 20
+
+# Output-token caps per kind of call; Watsonx decode time grows with
+# max_new_tokens, and a file summary rarely needs more than a paragraph.
+# Batched file summaries get BATCH_NEW_TOKENS_PER_FILE per file, so a batch
+# holds at most BATCH_MAX_FILES files or its JSON reply would be cut off.
+# The prompts ask for summaries short enough to fit these caps.
+MAX_NEW_TOKENS = 512
+FILE_SUMMARY_NEW_TOKENS = 128
+DIRECTORY_SUMMARY_NEW_TOKENS = 256
+BATCH_NEW_TOKENS_PER_FILE = 80
+BATCH_MAX_FILES = MAX_NEW_TOKENS // BATCH_NEW_TOKENS_PER_FILE
+
+# The developer guide is written from a one-line-per-entry outline; past
+# this many (estimated) tokens the outline is condensed section by section
+# first and the guide written from those notes
+GUIDE_MAX_PROMPT_TOKENS = 12000
+
+# Files longer than MAX_FILE_CHARS are cut down to their head and tail;
+# code files past CHUNKED_SUMMARY_MIN_CHARS are summarized chunk by chunk
+# (split on function/class boundaries) and the chunk summaries combined.
+MAX_FILE_CHARS = 8192
+TRUNCATE_HEAD_CHARS = 5000
+TRUNCATE_TAIL_CHARS = 2000
+CHUNKED_SUMMARY_MIN_CHARS = 32768
+BRACE_LANGUAGE_EXTS = frozenset({
+    ".js", ".jsx", ".ts", ".tsx", ".java", ".c", ".h", ".cpp", ".hpp",
+    ".cs", ".go", ".rs", ".kt", ".swift", ".php"
+})
+
+# Chatbot prompt bounds: once the history passes MAX_CHAT_TURNS, older
+# turns are compressed into one summary entry (keeping the most recent
+# MAX_CHAT_TURNS // 2), and the code summary context is head/tail-truncated.
+# The compressed summary is capped at CHAT_SUMMARY_NEW_TOKENS.
+MAX_CHAT_TURNS = 12
+CHAT_HISTORY_MARKER = "[history]"
+CHAT_SUMMARY_NEW_TOKENS = 256
+CHAT_CONTEXT_HEAD_CHARS = 16000
+CHAT_CONTEXT_TAIL_CHARS = 4000
+
+# Watsonx responses that are retried with exponential backoff + jitter
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRIES = 5
+MAX_BACKOFF_SECONDS = 30
+
+# -------------------------------------------------------------------
+# Shared HTTP Session
+# -------------------------------------------------------------------
+# One keep-alive session for IAM and Watsonx so repeated calls reuse
+# pooled connections instead of redoing DNS/TCP/TLS every time.
+_SESSION = requests.Session()
+
+def configure_http_pool(pool_size: int):
+    """
+    (Re)mounts the session's HTTP(S) adapter. Each host keeps one pooled
+    connection per worker thread; pool_block makes extra callers wait for a
+    free connection instead of opening (and then discarding) short-lived
+    sockets. The adapter only retries failures to connect, before anything
+    was sent: a POST that timed out or dropped mid-generation may already
+    have run (and been billed), so read errors and HTTP statuses are not
+    retried here. Status retries are handled in generate_text so they can
+    honor Retry-After and add jitter.
+    """
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_size,
+        pool_block=True,
+        max_retries=Retry(total=MAX_RETRIES, connect=MAX_RETRIES, read=0, status=0, backoff_factor=0.5)
+    )
+    # Plain http:// too, for self-hosted / on-prem Watsonx endpoints
+    for prefix in ("https://", "http://"):
+        _SESSION.mount(prefix, adapter)
+
+configure_http_pool(MAX_CONCURRENT_REQUESTS)
 
 # -------------------------------------------------------------------
 # IBM Cloud IAM Token Retrieval
 # -------------------------------------------------------------------
-def get_iam_token(api_key: str) -> str:
+def request_iam_token(api_key: str) -> dict:
     """
-    Exchanges an IBM Cloud API key for a short-lived IAM access token.
+    Exchanges an IBM Cloud API key for a short-lived IAM access token,
+    returning the full IAM response ('access_token', 'expiration', ...).
     """
     url = "https://iam.cloud.ibm.com/identity/token"
     payload = {
@@ -39,32 +165,92 @@ def get_iam_token(api_key: str) -> str:
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
 
-    response = requests.post(url, data=payload, headers=headers)
+    response = _SESSION.post(url, data=payload, headers=headers)
     response.raise_for_status()
-    data = response.json()
-    return data["access_token"]
+    return orjson.loads(response.content)
 
 # -------------------------------------------------------------------
 # Watsonx Generate Text Function
 # -------------------------------------------------------------------
+# Granite chat template fragments, shared by every request
+_ROLE_SYSTEM_OPEN = "<|start_of_role|>system<|end_of_role|>"
+_ROLE_SYSTEM_CLOSE = "<|end_of_text|>\n"
+_ROLE_USER_OPEN = "<|start_of_role|>user<|end_of_role|>"
+_ROLE_ASSISTANT_OPEN = "<|start_of_role|>assistant<|end_of_role|>"
+
+@functools.lru_cache(maxsize=4)
+def _auth_headers(token: str) -> dict:
+    """
+    Request headers for a given IAM token, built once per token rather
+    than per call. Treat the returned dict as read-only.
+    """
+    return {
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json"
+    }
+
+def _retry_delay(response: requests.Response, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a throttled/failed request: the
+    server's Retry-After if it sent one, else exponential backoff + jitter.
+    """
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_BACKOFF_SECONDS)
+    return min(2 ** attempt, MAX_BACKOFF_SECONDS) + random.random()
+
+def stream_endpoint(region_endpoint: str) -> str or None:
+    """
+    The server-sent-events twin of a /text/generation endpoint URL
+    (/text/generation_stream, same query string), or None if the URL
+    doesn't have that shape.
+    """
+    path, sep, query = region_endpoint.partition("?")
+    if not path.rstrip("/").endswith("/text/generation"):
+        return None
+    return f"{path.rstrip('/')}_stream{sep}{query}"
+
+def _read_generation_stream(response: requests.Response) -> str or None:
+    """
+    Accumulate 'generated_text' from each 'data:' frame of a streamed
+    Watsonx response, as the tokens arrive.
+    """
+    parts = []
+    with response:
+        for line in response.iter_lines():
+            if not line.startswith(b"data:"):
+                continue  # id:/event: lines and keep-alive blanks
+            try:
+                frame = orjson.loads(line[5:])
+            except orjson.JSONDecodeError:
+                logging.warning("Skipping malformed stream frame: %r", line[:200])
+                continue
+            for result in frame.get("results", []):
+                parts.append(result.get("generated_text", ""))
+    if not parts:
+        return None
+    return "".join(parts).strip()
+
 def generate_text(
     token: str,
     system_prompt: str,
     user_prompt: str,
     region_endpoint: str,
     project_id: str,
-    model_id: str = "ibm/granite-3-8b-instruct"
+    model_id: str = "ibm/granite-3-8b-instruct",
+    max_new_tokens: int = MAX_NEW_TOKENS
 ) -> str or None:
     """
-    Sends a system + user prompt to the Watsonx endpoint,
-    returning the 'generated_text' from the first result.
+    Sends a system + user prompt to the Watsonx endpoint, returning the
+    'generated_text' from the first result. Uses the streaming variant of
+    the endpoint when one can be derived, so the reply is read as it is
+    generated rather than buffered as one JSON body.
     """
-    combined_input = (
-        f"<|start_of_role|>system<|end_of_role|>{system_prompt}"
-        "<|end_of_text|>\n"
-        f"<|start_of_role|>user<|end_of_role|>{user_prompt}"
-        "<|start_of_role|>assistant<|end_of_role|>"
-    )
+    # Prompts can carry surrogate-escaped filenames, which orjson rejects
+    combined_input = scrub_surrogates("".join((
+        _ROLE_SYSTEM_OPEN, system_prompt, _ROLE_SYSTEM_CLOSE,
+        _ROLE_USER_OPEN, user_prompt, _ROLE_ASSISTANT_OPEN
+    )))
 
     payload = {
         "input": combined_input,
@@ -72,42 +258,189 @@ def generate_text(
         "project_id": project_id,
         "parameters": {
             "decoding_method": "greedy",
-            "max_new_tokens": 512
+            "max_new_tokens": max_new_tokens
         }
     }
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Content-Type": "application/json"
-    }
+    body = orjson.dumps(payload)
+    headers = _auth_headers(token)
+    stream_url = stream_endpoint(region_endpoint)
+
+    for attempt in range(MAX_RETRIES + 1):
+        response = _SESSION.post(
+            stream_url or region_endpoint,
+            data=body,
+            headers=headers,
+            stream=stream_url is not None
+        )
+        if response.status_code not in RETRY_STATUS_CODES or attempt == MAX_RETRIES:
+            break
+        response.close()  # hand the connection back to the pool while we wait
+        delay = _retry_delay(response, attempt)
+        logging.warning(
+            "Watsonx returned %s, retrying in %.1fs (attempt %d/%d)",
+            response.status_code, delay, attempt + 1, MAX_RETRIES
+        )
+        time.sleep(delay)
 
-    response = requests.post(region_endpoint, json=payload, headers=headers)
+    if response.status_code == 401:
+        # Expired/invalid IAM token: let the caller refresh it and retry
+        response.close()
+        response.raise_for_status()
     if response.status_code != 200:
         logging.error("Non-200 response: %s %s", response.status_code, response.text)
         return None
 
-    data = response.json()
+    if stream_url:
+        return _read_generation_stream(response)
+    data = orjson.loads(response.content)
     results = data.get("results", [])
     if not results:
         return None
 
     return results[0].get("generated_text", "").strip()
 
+def scrub_surrogates(text: str) -> str:
+    """
+    Make text safe to encode as UTF-8. Filenames that aren't valid UTF-8
+    come back from os.scandir with surrogate escapes; their raw bytes are
+    decoded again here, with U+FFFD for whatever still doesn't decode.
+    """
+    return text.encode("utf-8", "surrogateescape").decode("utf-8", "replace")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting prompts (~4 bytes per token)."""
+    return len(text.encode("utf-8")) // 4
+
+def truncate_middle(
+    text: str,
+    head: int = TRUNCATE_HEAD_CHARS,
+    tail: int = TRUNCATE_TAIL_CHARS
+) -> str:
+    """Keep the first `head` and last `tail` characters of long text."""
+    if len(text) <= head + tail:
+        return text
+    return f"{text[:head]}\n...\n{text[-tail:]}"
+
+def first_sentence(text: str) -> str:
+    """The first sentence of a summary, on one line, for compact outlines."""
+    text = " ".join(text.split())
+    end = text.find(". ")
+    return text if end == -1 else text[:end + 1]
+
+def _python_boundaries(content: str) -> list:
+    """Line numbers (0-based) where top-level Python statements start."""
+    boundaries = []
+    for node in ast.parse(content).body:
+        decorators = getattr(node, "decorator_list", [])
+        start = min([node.lineno] + [d.lineno for d in decorators])
+        boundaries.append(start - 1)
+    return boundaries
+
+def _column0_boundaries(lines: list) -> list:
+    """
+    Line numbers (0-based) of lines that start at column 0: top-level
+    statements, for Python that won't parse (e.g. a head/tail excerpt of a
+    large file). Closing brackets, comments and the line after a decorator
+    are skipped so they stay with what they belong to.
+    """
+    boundaries = []
+    for i, line in enumerate(lines):
+        if not line[:1].strip() or line[0] in ")]}#":
+            continue
+        if i and lines[i - 1].startswith("@"):
+            continue
+        boundaries.append(i)
+    return boundaries
+
+def _brace_boundaries(lines: list) -> list:
+    """Line numbers (0-based) that start a new top-level brace block."""
+    boundaries, depth = [], 0
+    for i, line in enumerate(lines):
+        if depth == 0:
+            boundaries.append(i)
+        depth = max(0, depth + line.count("{") - line.count("}"))
+    return boundaries
+
+def split_code_chunks(content: str, suffix: str, max_chars: int = MAX_FILE_CHARS) -> list:
+    """
+    Splits source code into chunks of at most ~max_chars, cutting on
+    top-level definitions (ast for Python, or column-0 lines when it
+    doesn't parse; brace depth for C-like languages) where possible and on
+    line boundaries otherwise.
+    """
+    lines = content.splitlines(keepends=True)
+    boundaries = None
+    if suffix == ".py":
+        try:
+            boundaries = _python_boundaries(content)
+        except (SyntaxError, ValueError):
+            boundaries = _column0_boundaries(lines)
+    elif suffix in BRACE_LANGUAGE_EXTS:
+        boundaries = _brace_boundaries(lines)
+    if not boundaries:
+        boundaries = list(range(len(lines)))
+
+    starts = sorted(set([0] + boundaries))
+    segments = [
+        "".join(lines[start:end])
+        for start, end in zip(starts, starts[1:] + [len(lines)])
+    ]
+
+    chunks, current = [], ""
+    for segment in segments:
+        if current and len(current) + len(segment) > max_chars:
+            chunks.append(current)
+            current = ""
+        while len(segment) > max_chars:
+            # A single definition larger than a chunk: fall back to hard splits
+            chunks.append(segment[:max_chars])
+            segment = segment[max_chars:]
+        current += segment
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _parse_json_object(text: str or None) -> dict or None:
+    """
+    Extracts the first JSON object from a model response, tolerating
+    surrounding prose or markdown code fences. Returns None if there is none.
+    """
+    if not text:
+        return None
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        parsed = orjson.loads(text[start:end + 1])
+    except orjson.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
 # -------------------------------------------------------------------
 # ProjectAnalyzer: Scans a folder, summarizes code, and generates docs
 # -------------------------------------------------------------------
 class ProjectAnalyzer:
-    def __init__(self, project_dir: str):
+    def __init__(self, project_dir: str, use_cache: bool = True):
         load_dotenv()  # Load environment variables from a .env file if present
 
         self.ibm_api_key = os.getenv("IBM_API_KEY")
         self.region_endpoint = os.getenv("REGION_ENDPOINT")
         self.project_id = os.getenv("PROJECT_ID")
         self.model_id = os.getenv("MODEL_ID", "ibm/granite-3-8b-instruct")
+        max_workers = os.getenv("MAX_WORKERS", str(MAX_CONCURRENT_REQUESTS))
+        try:
+            self.max_workers = int(max_workers)
+        except ValueError:
+            raise ValueError(f"MAX_WORKERS must be a whole number, got {max_workers!r}") from None
+        if self.max_workers < 1:
+            logging.warning(f"MAX_WORKERS={self.max_workers} is below 1; using 1")
+            self.max_workers = 1
 
         if not self.ibm_api_key or not self.region_endpoint:
             raise ValueError("IBM_API_KEY or REGION_ENDPOINT missing from environment / .env")
 
         self.project_dir = Path(project_dir)
+        self._root_parts_len = len(self.project_dir.parts)  # see _rel()
         self.script_dir = Path(__file__).parent
         self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
@@ -115,10 +448,25 @@ class ProjectAnalyzer:
         self.findings_dir.mkdir(parents=True, exist_ok=True)
 
         self.findings_path = self.findings_dir / "findings.json"
+        self.findings_log_path = self.findings_dir / "findings.jsonl"
         self.initial_summaries_path = self.script_dir / f"initial-summaries_{self.timestamp}.txt"
-
-        self.token = get_iam_token(self.ibm_api_key)
+        self.cache_path = self.script_dir / ".summary_cache.sqlite"
+        self.use_cache = use_cache  # False: ignore cached entries, but still refresh them
+
+        configure_http_pool(self.max_workers)
+        # Caps in-flight Watsonx calls across every thread pool (directory
+        # batches, batched files, chunked summaries), however they nest
+        self._llm_slots = threading.BoundedSemaphore(self.max_workers)
+        self._token_lock = threading.Lock()
+        self._token = None
+        self._token_expiry = 0.0  # epoch seconds, from the IAM response
+        self._refresh_token()
+        self._lock = threading.Lock()
+        self._tree = {}  # {directory Path: [file Paths]}, filled by _build_tree()
+        self._content_hashes = {}  # {content digest: first file Path seen with it}
+        self._file_digests = {}  # {file Path: content digest}
         self._init_findings_file()
+        self._init_summary_cache()
 
         logging.info("Initialized ProjectAnalyzer:")
         logging.info(f"- Project directory: {self.project_dir}")
@@ -126,58 +474,325 @@ class ProjectAnalyzer:
         logging.info(f"- Findings directory: {self.findings_dir}")
         logging.info(f"- Initial summaries: {self.initial_summaries_path}")
         logging.info(f"- Findings JSON: {self.findings_path}")
+        logging.info(f"- Findings log: {self.findings_log_path}")
+        logging.info(f"- Summary cache: {self.cache_path} ({'on' if use_cache else 'refresh only'})")
+        logging.info(f"- Max concurrent requests: {self.max_workers}")
+
+    def _token_is_stale(self) -> bool:
+        """True once the token is within the refresh margin of expiring."""
+        return time.time() > self._token_expiry - TOKEN_REFRESH_MARGIN_SECONDS
+
+    def _refresh_token(self, rejected_token: str = None):
+        """
+        Mint a new IAM token and record when it expires (the IAM
+        'expiration' timestamp). Concurrent callers are coalesced: whoever
+        gets the lock second finds the token already replaced and reuses it.
+        rejected_token is the token a 401 came back for, if any.
+        """
+        with self._token_lock:
+            if rejected_token is not None and self._token != rejected_token:
+                return
+            if rejected_token is None and not self._token_is_stale():
+                return
+            data = request_iam_token(self.ibm_api_key)
+            self._token_expiry = data.get("expiration") or time.time() + TOKEN_TTL_SECONDS
+            self._token = data["access_token"]
+
+    @property
+    def token(self) -> str:
+        """The current IAM token, re-minted lazily shortly before it expires."""
+        if self._token_is_stale():
+            self._refresh_token()
+        return self._token
+
+    def _generate_text(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_new_tokens: int = MAX_NEW_TOKENS,
+        cacheable: bool = True
+    ) -> str or None:
+        """
+        generate_text() with this analyzer's credentials and model. A 401
+        forces one token refresh and retry before giving up. Cacheable
+        responses are stored in the persistent cache keyed by the prompts,
+        model and output cap, so identical prompts on re-runs skip the HTTP
+        round-trip.
+        """
+        cache_key = None
+        if cacheable:
+            # surrogatepass: undecodable filenames (surrogate-escaped by
+            # os.scandir) may appear in prompts and must still hash
+            cache_key = hashlib.sha256("\0".join((
+                self.model_id, str(max_new_tokens), system_prompt, user_prompt
+            )).encode("utf-8", "surrogatepass")).hexdigest()
+            cached = self._get_cached_response(cache_key)
+            if cached is not None:
+                return cached
+
+        response = self._request_text(system_prompt, user_prompt, max_new_tokens)
+        if response and cache_key:
+            self._cache_response(cache_key, response)
+        return response
+
+    def _request_text(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_new_tokens: int = MAX_NEW_TOKENS
+    ) -> str or None:
+        """
+        Call Watsonx, refreshing the IAM token once on a 401. Waits for one
+        of max_workers request slots, so nested pools can't oversubscribe.
+        """
+        kwargs = dict(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            region_endpoint=self.region_endpoint,
+            project_id=self.project_id,
+            model_id=self.model_id,
+            max_new_tokens=max_new_tokens
+        )
+        with self._llm_slots:
+            token = self.token
+            try:
+                return generate_text(token=token, **kwargs)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 401:
+                    raise
+                logging.info("IAM token rejected; refreshing and retrying once")
+                self._refresh_token(rejected_token=token)
+                try:
+                    return generate_text(token=self.token, **kwargs)
+                except requests.HTTPError as retry_error:
+                    logging.error("Request failed after token refresh: %s", retry_error)
+                    return None
 
     def _init_findings_file(self):
-        """Create the findings.json with an initial structure."""
-        initial_structure = {
+        """
+        Set up the in-memory findings and long-lived, 1 MiB-buffered handles
+        for the append-only findings log and summaries file (closed by
+        close()). Buffered data reaches disk at _flush_findings()
+        checkpoints; findings.json itself is only written by
+        _finalize_findings().
+        """
+        self._findings = {
             "root_summary": "",
             "directories": {},
             "files": {}
         }
-        self._write_findings(initial_structure)
+        self._findings_log_fp = open(self.findings_log_path, "ab", buffering=SUMMARY_BUFFER_BYTES)
+        self._summaries_fp = open(
+            self.initial_summaries_path, "a", encoding="utf-8", buffering=SUMMARY_BUFFER_BYTES
+        )
+        self._findings_dirty = True  # findings.json not yet written for this state
 
     def _write_findings(self, data: dict):
-        """Overwrite findings.json with the given dictionary."""
-        with open(self.findings_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        """Overwrite findings.json with the given dictionary (pretty-printed)."""
+        self.findings_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
     def _append_to_summaries(self, content: str):
-        """Append text content to the initial summaries .txt file."""
-        with open(self.initial_summaries_path, "a", encoding="utf-8") as f:
-            f.write(f"{content}\n\n")
-
-    def _read_findings(self) -> dict:
-        """Load the current findings from findings.json."""
-        with open(self.findings_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        """Buffer text content for the initial summaries .txt file."""
+        content = scrub_surrogates(content)  # non-UTF-8 filenames, as in the findings
+        with self._lock:
+            self._summaries_fp.write(f"{content}\n\n")
 
     def _update_findings(self, key, value: str):
         """
-        Update a portion of the JSON data (key can be a tuple for nested).
+        Update a portion of the in-memory findings (key can be a tuple for nested).
         E.g. ('files', 'path/to/file') -> "some summary"
+        Each update is also queued as one line for the findings.jsonl log.
         """
-        findings = self._read_findings()
         if isinstance(key, tuple):
-            current = findings
-            for part in key[:-1]:
-                current = current.setdefault(part, {})
-            current[key[-1]] = value
+            # orjson rejects surrogate-escaped (non-UTF-8) filenames
+            key = tuple(scrub_surrogates(part) for part in key)
+            record = {"kind": key[0], "path": "/".join(key[1:]), "summary": value}
+        else:
+            record = {"kind": key, "summary": value}
+
+        with self._lock:
+            self._findings_log_fp.write(orjson.dumps(record) + b"\n")
+            self._findings_dirty = True
+            if isinstance(key, tuple):
+                current = self._findings
+                for part in key[:-1]:
+                    current = current.setdefault(part, {})
+                current[key[-1]] = value
+            else:
+                self._findings[key] = value
+
+    def _flush_findings(self):
+        """
+        Checkpoint: push buffered findings records and summaries to disk.
+        Only the new entries are written, never the whole findings blob.
+        """
+        with self._lock:
+            self._findings_log_fp.flush()
+            self._summaries_fp.flush()
+
+    def _finalize_findings(self):
+        """
+        Flush pending entries and write the combined findings.json, skipping
+        the rewrite if nothing changed since the last one.
+        """
+        self._flush_findings()
+        with self._lock:
+            if self._findings_dirty:
+                self._write_findings(self._findings)
+                self._findings_dirty = False
+
+    def close(self):
+        """Write out findings and release the output file handles and cache."""
+        self._finalize_findings()
+        self._commit_summary_cache()
+        with self._lock:
+            self._findings_log_fp.close()
+            self._summaries_fp.close()
+        with self._cache_lock:
+            self._cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _init_summary_cache(self):
+        """
+        Open the persistent cache. File summaries are keyed on the file's
+        path, mtime, size and the model (and on its content digest, which
+        survives touch/checkout); raw Watsonx responses are keyed on a hash
+        of the prompts and model.
+        """
+        self._cache_lock = threading.Lock()
+        self._cache_prefix = str(self.project_dir.resolve())
+        self._cache = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._cache.execute(
+            "CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT)"
+        )
+        self._cache.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, generated_text TEXT)"
+        )
+
+    def _get_cached_response(self, key: str) -> str or None:
+        """Return a cached Watsonx response for this prompt hash, if any."""
+        if not self.use_cache:
+            return None
+        with self._cache_lock:
+            row = self._cache.execute(
+                "SELECT generated_text FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _cache_response(self, key: str, generated_text: str):
+        """Remember a Watsonx response (committed with the other cache writes)."""
+        with self._cache_lock:
+            self._cache.execute(
+                "INSERT OR REPLACE INTO responses (key, generated_text) VALUES (?, ?)",
+                (key, generated_text)
+            )
+
+    def _content_cache_key(self, digest: str) -> str:
+        """Cache key for a file summary looked up by content digest."""
+        return f"content:{digest}|{self.model_id}"
+
+    def _summary_cache_key(self, file_path: Path) -> str or None:
+        """Build the cache key for a file, or None if it can't be stat'd."""
+        try:
+            st = file_path.stat()
+        except OSError:
+            return None
+        key = f"{self._cache_prefix}/{self._rel(file_path)}|{st.st_mtime_ns}|{st.st_size}|{self.model_id}"
+        # sqlite needs valid UTF-8; escape undecodable filename bytes as \xNN
+        # (a no-op for ordinary names, and still unique per file)
+        return key.encode("utf-8", "surrogateescape").decode("utf-8", "backslashreplace")
+
+    def _get_cached_summary(self, file_path: Path, digest: str = None) -> str or None:
+        """
+        Return the cached summary for an unchanged file, if any. Looks up the
+        stat-based key, or the content-digest key when a digest is given.
+        """
+        if not self.use_cache:
+            return None
+        if digest is None:
+            key = self._summary_cache_key(file_path)
+            if key is None:
+                return None
         else:
-            findings[key] = value
-        self._write_findings(findings)
+            key = self._content_cache_key(digest)
+        with self._cache_lock:
+            row = self._cache.execute(
+                "SELECT summary FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[0] == NO_RESPONSE:
+            return None  # a failed call cached by an earlier version
+        return row[0]
+
+    def _cache_summary(self, file_path: Path, summary: str):
+        """Remember a freshly generated summary (committed at the end of the run)."""
+        keys = [self._summary_cache_key(file_path)]
+        if file_path in self._file_digests:
+            keys.append(self._content_cache_key(self._file_digests[file_path]))
+        with self._cache_lock:
+            self._cache.executemany(
+                "INSERT OR REPLACE INTO summaries (key, summary) VALUES (?, ?)",
+                [(key, summary) for key in keys if key is not None]
+            )
 
-    def is_excluded(self, path: Path) -> bool:
-        """Check if a file/dir is in the excluded list."""
-        return any(excluded in str(path) for excluded in EXCLUSION_LIST)
+    def _commit_summary_cache(self):
+        """Commit the cache writes made during this run in one transaction."""
+        with self._cache_lock:
+            self._cache.commit()
+
+    def _rel(self, path) -> str:
+        """
+        Path relative to the project as a string ("." for the root). Walked
+        paths all start with project_dir, so its parts are sliced off
+        directly instead of going through Path.relative_to().
+        """
+        return os.sep.join(Path(path).parts[self._root_parts_len:]) or "."
+
+    def _build_tree(self):
+        """
+        Walk the project once and cache {directory: [files]} in self._tree,
+        so the root listing and per-directory analysis don't re-scan the disk.
+        Uses os.scandir so file/dir checks come from the cached DirEntry
+        type instead of an extra stat per entry; symlinks are not followed.
+        """
+        self._tree = {}
+        check_exclusions = bool(EXCLUDED_SET)
+        pending = [self.project_dir]
+        while pending:
+            dir_path = pending.pop()
+            files = []
+            try:
+                with os.scandir(dir_path) as it:
+                    for entry in it:
+                        if check_exclusions and entry.name in EXCLUDED_SET:
+                            continue  # excluded subtrees are never descended into
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(Path(entry.path))
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append(Path(entry.path))
+            except OSError as e:
+                logging.warning(f"Skipping unreadable directory {dir_path}: {e}")
+                continue
+            self._tree[dir_path] = files
+
+    def _get_tree(self) -> dict:
+        """Return the cached directory tree, walking the project if needed."""
+        if not self._tree:
+            self._build_tree()
+        return self._tree
 
     def analyze_root(self):
         """Summarize the entire root directory's structure."""
         logging.info("Analyzing root directory...")
-        all_paths = list(self.project_dir.rglob("*"))
-        root_contents = [
-            str(f.relative_to(self.project_dir)) for f in all_paths
-            if not self.is_excluded(f)
-        ]
+        root_contents = []
+        for dir_path, files in self._get_tree().items():
+            if dir_path != self.project_dir:
+                root_contents.append(self._rel(dir_path))
+            root_contents.extend(self._rel(f) for f in files)
         root_contents_str = "\n".join(root_contents)
 
         system_prompt = "You are an AI assistant that summarizes a project."
@@ -187,130 +802,564 @@ class ProjectAnalyzer:
             "Based on these names, what is the main language used, and what is the project's purpose?"
         )
 
-        summary = generate_text(
-            token=self.token,
+        summary = self._generate_text(
             system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            region_endpoint=self.region_endpoint,
-            project_id=self.project_id,
-            model_id=self.model_id
-        ) or "No response received."
+            user_prompt=user_prompt
+        ) or NO_RESPONSE
 
         self._update_findings("root_summary", summary)
         self._append_to_summaries(f"Project Overview:\n{summary}")
+        self._flush_findings()
         logging.info("Root analysis complete")
 
-    def analyze_file(self, file_path: Path) -> str or None:
-        """Summarize an individual file's content."""
-        rel_path = str(file_path.relative_to(self.project_dir))
+    def _is_source_file(self, file_path: Path) -> bool:
+        """
+        Cheap check that keeps binaries out of the read/summarize path: a
+        known source suffix, or else a peek at the file's head that finds
+        UTF-8 text without NUL bytes (PDFs, archives etc. fail the decode).
+        """
+        if file_path.suffix.lower() in SOURCE_EXTS:
+            return True
+        try:
+            with open(file_path, "rb") as f:
+                head = f.read(BINARY_SNIFF_BYTES)
+            if head and b"\x00" not in head:
+                head.decode("utf-8")
+                return True
+        except UnicodeDecodeError as e:
+            # A multi-byte character cut off at the end of the peek is fine
+            if e.reason == "unexpected end of data":
+                return True
+        except OSError:
+            pass
+        rel_path = self._rel(file_path)
+        logging.info(f"Skipping non-source file: {rel_path}")
+        return False
+
+    def _read_source(self, file_path: Path) -> str or None:
+        """
+        Read a file as UTF-8 text, or return None if it is unreadable. Files
+        over MAX_FILE_BYTES are never loaded whole: only their first
+        READ_HEAD_BYTES and last READ_TAIL_BYTES are read, trimmed to whole
+        lines around a truncation marker line.
+        """
+        try:
+            size = os.path.getsize(file_path)
+            if size <= MAX_FILE_BYTES:
+                return file_path.read_bytes().decode("utf-8", "replace")
+
+            with open(file_path, "rb") as f:
+                head = f.read(READ_HEAD_BYTES)
+                f.seek(-READ_TAIL_BYTES, os.SEEK_END)
+                tail = f.read()
+            # Drop the partial lines at both cuts, so code chunking sees
+            # whole lines (and never a split multi-byte character)
+            cut = head.rfind(b"\n")
+            if cut != -1:
+                head = head[:cut + 1]
+            cut = tail.find(b"\n")
+            if cut != -1:
+                tail = tail[cut + 1:]
+            skipped = size - len(head) - len(tail)
+            head_text = head.decode("utf-8", "replace")
+            if not head_text.endswith("\n"):
+                head_text += "\n"  # a single line longer than the head
+            return (
+                f"{head_text}... [truncated {skipped} bytes] ...\n"
+                f"{tail.decode('utf-8', 'replace')}"
+            )
+        except OSError:
+            rel_path = self._rel(file_path)
+            logging.warning(f"Skipping unreadable file: {rel_path}")
+            return None
+
+    def _read_sources(self, paths: list) -> list:
+        """
+        Read several files at once, overlapping their disk I/O on a small
+        thread pool. Returns contents (or None) in the same order as paths.
+        """
+        if len(paths) <= 1:
+            return [self._read_source(path) for path in paths]
+        with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(paths))) as executor:
+            return list(executor.map(self._read_source, paths))
+
+    def _record_file_summary(self, rel_path: str, summary: str):
+        """Store a file summary in the findings and the summaries log."""
+        self._update_findings(("files", rel_path), summary)
+        self._append_to_summaries(f"File: {rel_path}\n{summary}")
+        logging.info(f"Completed analysis of file: {rel_path}")
+
+    def _prepare_sources(self, files: list) -> tuple:
+        """
+        Split files into cached summaries, (path, content) pairs that still
+        need a Watsonx call, and byte-identical duplicates of files already
+        queued this run. Returns ({path: summary or None}, sources,
+        {duplicate path: original path}).
+        """
+        results = {}
+        sources = []
+        duplicates = {}
+        to_read = []
+        for file_path in files:
+            if not self._is_source_file(file_path):
+                results[file_path] = None
+                continue
+
+            cached = self._get_cached_summary(file_path)
+            if cached is not None:
+                rel_path = self._rel(file_path)
+                logging.info(f"Using cached summary for: {rel_path}")
+                self._record_file_summary(rel_path, cached)
+                results[file_path] = cached
+                continue
+            to_read.append(file_path)
+
+        for file_path, content in zip(to_read, self._read_sources(to_read)):
+            if content is None:
+                results[file_path] = None
+                continue
+
+            digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+            self._file_digests[file_path] = digest
+            cached = self._get_cached_summary(file_path, digest)
+            if cached is not None:
+                # Content unchanged even though mtime/size moved (touch, checkout)
+                rel_path = self._rel(file_path)
+                logging.info(f"Using cached summary for unchanged content: {rel_path}")
+                self._cache_summary(file_path, cached)
+                self._record_file_summary(rel_path, cached)
+                results[file_path] = cached
+                continue
+
+            original = self._content_hashes.setdefault(digest, file_path)
+            if original != file_path:
+                duplicates[file_path] = original
+            else:
+                sources.append((file_path, content))
+        return results, sources, duplicates
+
+    def _resolve_duplicates(self, duplicates: dict, results: dict):
+        """
+        Give each duplicate file the summary of the file it is identical to.
+        If the original's Watsonx call failed, the duplicate is recorded as
+        failed too and nothing is cached, so both are retried next run.
+        """
+        for file_path, original in duplicates.items():
+            if original in results:
+                summary = results[original]
+            else:
+                with self._lock:
+                    summary = self._findings["files"].get(self._rel(original))
+            if summary == NO_RESPONSE:
+                summary = None
+            results[file_path] = summary
+            rel_path = self._rel(file_path)
+            if summary:
+                logging.info(f"Reusing summary of identical file for: {rel_path}")
+                self._cache_summary(file_path, summary)
+                self._record_file_summary(rel_path, summary)
+            else:
+                self._record_file_summary(rel_path, NO_RESPONSE)
+
+    def analyze_file(self, file_path: Path, content: str = None) -> str or None:
+        """
+        Summarize an individual file's content. When content isn't given, the
+        summary cache is consulted before the file is read from disk.
+        """
+        rel_path = self._rel(file_path)
         logging.info(f"Analyzing file: {rel_path}")
 
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-        except (UnicodeDecodeError, OSError):
-            logging.warning(f"Skipping binary or unreadable file: {rel_path}")
+        if content is None:
+            if not self._is_source_file(file_path):
+                return None
+            cached = self._get_cached_summary(file_path)
+            if cached is not None:
+                self._record_file_summary(rel_path, cached)
+                return cached
+            content = self._read_source(file_path)
+            if content is None:
+                return None
+
+        suffix = file_path.suffix.lower()
+        is_code = suffix == ".py" or suffix in BRACE_LANGUAGE_EXTS
+        if len(content) > CHUNKED_SUMMARY_MIN_CHARS and is_code:
+            summary = self._summarize_in_chunks(rel_path, suffix, content)
+        else:
+            system_prompt = "You are an AI assistant that analyzes a source code file."
+            user_prompt = (
+                f"File path: {rel_path}\n\n"
+                f"Content:\n{truncate_middle(content)}\n\n"
+                "Please summarize this file's purpose, main functions/classes, and how it fits into the project, "
+                "in at most 3 sentences."
+            )
+
+            summary = self._generate_text(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                max_new_tokens=FILE_SUMMARY_NEW_TOKENS
+            )
+        if not summary:
+            # Record the failure, but return None so it is neither cached
+            # nor reused for identical files or the directory summary
+            self._record_file_summary(rel_path, NO_RESPONSE)
+            return None
+
+        self._cache_summary(file_path, summary)
+        self._record_file_summary(rel_path, summary)
+        return summary
+
+    def _summarize_in_chunks(self, rel_path: str, suffix: str, content: str) -> str or None:
+        """
+        Map-reduce summary for large code files: summarize each chunk, then
+        ask for a file summary built from the chunk summaries.
+        """
+        chunks = split_code_chunks(content, suffix)
+        logging.info(f"Summarizing {rel_path} in {len(chunks)} chunks")
+
+        def summarize_chunk(numbered_chunk):
+            i, chunk = numbered_chunk
+            return self._generate_text(
+                system_prompt="You are an AI assistant that analyzes part of a source code file.",
+                user_prompt=(
+                    f"File path: {rel_path} (part {i} of {len(chunks)})\n\n"
+                    f"Content:\n{chunk}\n\n"
+                    "Briefly summarize the functions/classes defined in this part, "
+                    "in at most 3 sentences."
+                ),
+                max_new_tokens=FILE_SUMMARY_NEW_TOKENS
+            )
+
+        # Chunks are independent; the shared request slots keep this
+        # nested pool from exceeding max_workers in-flight calls overall.
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as executor:
+            responses = list(executor.map(summarize_chunk, enumerate(chunks, start=1)))
+        chunk_summaries = [
+            f"Part {i}: {chunk_summary}"
+            for i, chunk_summary in enumerate(responses, start=1) if chunk_summary
+        ]
+        if not chunk_summaries:
             return None
 
+        parts_block = "\n".join(chunk_summaries)
         system_prompt = "You are an AI assistant that analyzes a source code file."
         user_prompt = (
             f"File path: {rel_path}\n\n"
-            f"Content:\n{content}\n\n"
-            "Please summarize this file's purpose, main functions/classes, and how it fits into the project."
+            f"Summaries of consecutive parts of the file:\n{parts_block}\n\n"
+            "Please summarize this file's purpose, main functions/classes, and how it fits into the project, "
+            "in at most 3 sentences."
         )
-
-        summary = generate_text(
-            token=self.token,
+        return self._generate_text(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
-            region_endpoint=self.region_endpoint,
-            project_id=self.project_id,
-            model_id=self.model_id
-        ) or "No response received."
+            max_new_tokens=FILE_SUMMARY_NEW_TOKENS
+        )
 
-        self._update_findings(("files", rel_path), summary)
-        self._append_to_summaries(f"File: {rel_path}\n{summary}")
-        logging.info(f"Completed analysis of file: {rel_path}")
-        return summary
+    @staticmethod
+    def _pack_batches(sources: list, max_tokens: int) -> list:
+        """
+        Greedily group (path, content) pairs into batches whose combined
+        content stays under max_tokens (estimated) and that hold at most
+        BATCH_MAX_FILES files, so the reply fits its output cap. Oversized
+        files, and files that need truncation or chunking, end up alone.
+        """
+        batches, current, size = [], [], 0
+        for file_path, content in sources:
+            if len(content) > MAX_FILE_CHARS:
+                batches.append([(file_path, content)])
+                continue
+            tokens = estimate_tokens(content)
+            if current and (size + tokens > max_tokens or len(current) >= BATCH_MAX_FILES):
+                batches.append(current)
+                current, size = [], 0
+            current.append((file_path, content))
+            size += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _analyze_batch(self, batch: list) -> dict:
+        """
+        Summarize a batch of (path, content) pairs with a single Watsonx call.
+        Falls back to per-file analysis if the response isn't usable JSON.
+        """
+        if len(batch) == 1:
+            file_path, content = batch[0]
+            return {file_path: self.analyze_file(file_path, content)}
 
-    def analyze_directory(self, dir_path: Path):
-        """Summarize each file in a directory, then summarize the directory as a whole."""
-        if self.is_excluded(dir_path):
-            return
+        rel_paths = [self._rel(file_path) for file_path, _ in batch]
+        logging.info(f"Analyzing {len(batch)} files in one batch: {', '.join(rel_paths)}")
 
-        rel_path = str(dir_path.relative_to(self.project_dir))
-        logging.info(f"Analyzing directory: {rel_path}")
+        files_block = "".join(
+            f"=== FILE: {rel_path} ===\n{content}\n"
+            for rel_path, (_, content) in zip(rel_paths, batch)
+        )
+        system_prompt = "You are an AI assistant that analyzes source code files."
+        user_prompt = (
+            "Summarize each file below: its purpose, main functions/classes, "
+            "and how it fits into the project, in at most 2 sentences per file.\n"
+            "Return a strict JSON object mapping each file path to its summary, "
+            'e.g. {"path": "summary"}. Files:\n'
+            f"{files_block}"
+        )
 
-        if not dir_path.is_dir():
+        response = self._generate_text(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            max_new_tokens=min(MAX_NEW_TOKENS, BATCH_NEW_TOKENS_PER_FILE * len(batch))
+        )
+        parsed = _parse_json_object(response)
+        if parsed is None:
+            logging.warning("Could not parse batched summaries; falling back to per-file analysis")
+            return {file_path: self.analyze_file(file_path, content) for file_path, content in batch}
+
+        results = {}
+        for rel_path, (file_path, content) in zip(rel_paths, batch):
+            summary = parsed.get(rel_path)
+            if isinstance(summary, str) and summary.strip():
+                summary = summary.strip()
+                self._cache_summary(file_path, summary)
+                self._record_file_summary(rel_path, summary)
+            else:
+                summary = self.analyze_file(file_path, content)
+            results[file_path] = summary
+        return results
+
+    def analyze_files_batched(
+        self,
+        files: list,
+        max_prompt_tokens: int = BATCH_MAX_PROMPT_TOKENS
+    ) -> dict:
+        """
+        Summarize files, packing small ones together so several share one
+        Watsonx request, with batches sent concurrently (up to max_workers).
+        Returns {path: summary or None}.
+        """
+        results, sources, duplicates = self._prepare_sources(files)
+        batches = self._pack_batches(sources, max_prompt_tokens)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for batch_results in executor.map(self._analyze_batch, batches):
+                results.update(batch_results)
+        self._resolve_duplicates(duplicates, results)
+        self._commit_summary_cache()
+        return results
+
+    def summarize_directory(self, dir_path: Path, file_summaries: list):
+        """Summarize a directory from the summaries of the files it contains."""
+        if not file_summaries:
             return
 
-        files = [
-            f for f in dir_path.iterdir()
-            if f.is_file() and not self.is_excluded(f)
-        ]
-        if not files:
-            return
+        rel_path = self._rel(dir_path)
+        system_prompt = "You are an AI assistant that analyzes code directories."
+        user_prompt = (
+            f"Directory path: {rel_path}\n\n"
+            f"File Summaries:\n{''.join(file_summaries)}\n\n"
+            "What is the purpose of this directory, and how do these files work together? "
+            "Answer in one short paragraph."
+        )
 
-        file_summaries = []
-        for file in files:
-            file_summary = self.analyze_file(file)
-            if file_summary:
-                file_summaries.append(f"{file.name}: {file_summary}")
+        summary = self._generate_text(
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            max_new_tokens=DIRECTORY_SUMMARY_NEW_TOKENS
+        ) or NO_RESPONSE
 
-        if file_summaries:
-            system_prompt = "You are an AI assistant that analyzes code directories."
-            user_prompt = (
-                f"Directory path: {rel_path}\n\n"
-                f"File Summaries:\n{''.join(file_summaries)}\n\n"
-                "What is the purpose of this directory, and how do these files work together?"
-            )
+        self._update_findings(("directories", rel_path), summary)
+        self._append_to_summaries(f"Directory: {rel_path}\n{summary}")
+        self._flush_findings()
+        logging.info(f"Completed analysis of directory: {rel_path}")
 
-            summary = generate_text(
-                token=self.token,
-                system_prompt=system_prompt,
-                user_prompt=user_prompt,
-                region_endpoint=self.region_endpoint,
-                project_id=self.project_id,
-                model_id=self.model_id
-            ) or "No response received."
+    def analyze_directory(self, dir_path: Path, files: list = None):
+        """
+        Summarize each file in a directory, then summarize the directory as a whole.
+        The file list defaults to the cached walk of the project.
+        """
+        if files is None:
+            files = self._get_tree().get(dir_path, [])
+        if not files:
+            return
 
-            self._update_findings(("directories", rel_path), summary)
-            self._append_to_summaries(f"Directory: {rel_path}\n{summary}")
-            logging.info(f"Completed analysis of directory: {rel_path}")
+        rel_path = self._rel(dir_path)
+        logging.info(f"Analyzing directory: {rel_path}")
+
+        file_results = self.analyze_files_batched(files)
+        file_summaries = [
+            f"{f.name}: {file_results[f]}" for f in files if file_results[f]
+        ]
+        self.summarize_directory(dir_path, file_summaries)
 
     def analyze_project(self):
-        """Analyzes the project, generating summaries for files and directories."""
+        """
+        Analyzes the project, generating summaries for files and directories.
+        The root overview and file batches are summarized concurrently
+        (bounded by max_workers). Each directory summary is queued as soon as
+        the batches it depends on are done, so it overlaps with the file
+        analysis still running for other directories.
+        """
         logging.info(f"Starting analysis of project: {self.project_dir}")
-        self.analyze_root()
+        tree = self._get_tree()  # reuses a walk already done by analyze_root/analyze_directory
 
-        for root, dirs, _ in os.walk(self.project_dir):
-            dirs[:] = [
-                d for d in dirs
-                if not self.is_excluded(Path(root) / d)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # The root overview only needs the tree, so it runs alongside
+            # the file batches rather than ahead of them.
+            root_job = executor.submit(self.analyze_root)
+
+            directories = [
+                (dir_path, files) for dir_path, files in tree.items() if files
             ]
-            self.analyze_directory(Path(root))
 
+            file_results = {}
+            batches = []
+            batch_of_file = {}
+            waiting_on = {}  # {dir Path: indexes of batches it still needs}
+            duplicates_by_dir = {}
+            for dir_path, files in directories:
+                cached_results, sources, duplicates = self._prepare_sources(files)
+                file_results.update(cached_results)
+
+                needed = set()
+                for batch in self._pack_batches(sources, BATCH_MAX_PROMPT_TOKENS):
+                    needed.add(len(batches))
+                    for file_path, _ in batch:
+                        batch_of_file[file_path] = len(batches)
+                    batches.append(batch)
+                for original in duplicates.values():
+                    if original in batch_of_file:
+                        needed.add(batch_of_file[original])
+
+                waiting_on[dir_path] = needed
+                duplicates_by_dir[dir_path] = duplicates
+
+            files_by_dir = dict(directories)
+            dir_jobs = []
+
+            def start_ready_directories():
+                for dir_path in [d for d, needed in waiting_on.items() if not needed]:
+                    del waiting_on[dir_path]
+                    self._resolve_duplicates(duplicates_by_dir[dir_path], file_results)
+                    file_summaries = [
+                        f"{f.name}: {file_results[f]}"
+                        for f in files_by_dir[dir_path] if file_results.get(f)
+                    ]
+                    dir_jobs.append(
+                        executor.submit(self.summarize_directory, dir_path, file_summaries)
+                    )
+
+            # Feed batches in gradually so ready directory summaries don't
+            # queue up behind every remaining file batch.
+            next_batches = iter(enumerate(batches))
+            batch_jobs = {}
+
+            def submit_next_batch():
+                for index, batch in next_batches:
+                    batch_jobs[executor.submit(self._analyze_batch, batch)] = index
+                    return
+
+            for _ in range(self.max_workers):
+                submit_next_batch()
+            start_ready_directories()
+
+            while batch_jobs:
+                done, _ = wait(batch_jobs, return_when=FIRST_COMPLETED)
+                for job in done:
+                    index = batch_jobs.pop(job)
+                    file_results.update(job.result())
+                    for needed in waiting_on.values():
+                        needed.discard(index)
+                    submit_next_batch()
+                start_ready_directories()
+
+            for job in dir_jobs + [root_job]:
+                job.result()
+
+        self._commit_summary_cache()
+        self._finalize_findings()
         logging.info("Project analysis complete")
         return self.initial_summaries_path, self.findings_path
 
+    def _findings_outline(self) -> list:
+        """
+        Condense the findings into one outline block per directory: the
+        first sentence of the directory summary, then one line per file.
+        """
+        with self._lock:
+            directories = dict(self._findings["directories"])
+            files = dict(self._findings["files"])
+
+        files_by_dir = {}
+        for rel_path in sorted(files):
+            files_by_dir.setdefault(os.path.dirname(rel_path) or ".", []).append(rel_path)
+
+        blocks = []
+        for rel_dir in sorted(set(directories) | set(files_by_dir)):
+            lines = [f"{rel_dir}: {first_sentence(directories.get(rel_dir, ''))}"]
+            lines.extend(
+                f"  {os.path.basename(rel_path)}: {first_sentence(files[rel_path])}"
+                for rel_path in files_by_dir.get(rel_dir, [])
+            )
+            blocks.append("\n".join(lines))
+        return blocks
+
+    def _condense_outline(self, blocks: list) -> str:
+        """
+        Map step for outlines too large for one prompt: summarize groups of
+        directory blocks into architecture notes, concurrently.
+        """
+        groups, current, size = [], [], 0
+        for block in blocks:
+            tokens = estimate_tokens(block)
+            if current and size + tokens > GUIDE_MAX_PROMPT_TOKENS:
+                groups.append(current)
+                current, size = [], 0
+            current.append(block)
+            size += tokens
+        if current:
+            groups.append(current)
+        logging.info(f"Outline too large for one prompt; condensing {len(groups)} sections")
+
+        def condense(group):
+            # A single huge directory still has to fit (~4 chars per token)
+            section = truncate_middle(
+                "\n".join(group), GUIDE_MAX_PROMPT_TOKENS * 3, GUIDE_MAX_PROMPT_TOKENS
+            )
+            return self._generate_text(
+                system_prompt="You are an AI assistant that analyzes code directories.",
+                user_prompt=(
+                    "Below is an outline of part of a project (directories, with one "
+                    "line per file).\n\n"
+                    f"{section}\n\n"
+                    "Describe what this part of the project does, its key modules, and "
+                    "how they relate, as concise notes for a developer guide."
+                )
+            )
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as executor:
+            notes = [note for note in executor.map(condense, groups) if note]
+        return "\n\n".join(notes)
+
     def generate_developer_guide(self):
-        """Generates a developer guide in markdown based on the findings."""
+        """
+        Generates a developer guide in markdown from a compact outline of
+        the findings (map-reduced first if it is too large for one prompt).
+        """
         logging.info("Generating developer guide...")
+        self._finalize_findings()
 
-        with open(self.findings_path, "r", encoding="utf-8") as f:
-            findings = json.load(f)
-        with open(self.initial_summaries_path, "r", encoding="utf-8") as f:
-            initial_summaries = f.read()
+        with self._lock:
+            root_summary = self._findings["root_summary"]
+        blocks = self._findings_outline()
+        outline = "\n".join(blocks)
+        if estimate_tokens(outline) > GUIDE_MAX_PROMPT_TOKENS:
+            outline = self._condense_outline(blocks)
 
         system_prompt = "You are an AI assistant that creates developer guides."
         user_prompt = f"""
 Based on the collected analysis below, create a short developer guide in markdown:
 
-Initial Summaries:
-{initial_summaries}
+Project Overview:
+{root_summary}
 
-JSON Findings:
-{json.dumps(findings, indent=2)}
+Project Outline:
+{outline}
 
 Guide Outline:
 1. Executive Summary
@@ -323,14 +1372,12 @@ Guide Outline:
 8. Common Tasks
 """
 
-        guide_text = generate_text(
-            token=self.token,
+        guide_text = self._generate_text(
             system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            region_endpoint=self.region_endpoint,
-            project_id=self.project_id,
-            model_id=self.model_id
-        ) or "No response received."
+            user_prompt=user_prompt
+        ) or NO_RESPONSE
+
+        self._commit_summary_cache()
 
         guidebook_path = self.script_dir / f"guidebook_{self.timestamp}.md"
         with open(guidebook_path, "w", encoding="utf-8") as f:
@@ -342,34 +1389,93 @@ Guide Outline:
 # -------------------------------------------------------------------
 # Chatbot Logic
 # -------------------------------------------------------------------
-def load_context(analyzer: ProjectAnalyzer) -> str:
+def load_context(analyzer: ProjectAnalyzer) -> mmap.mmap or str:
     """
-    Returns the text from initial_summaries_path, or a fallback message
-    if the file doesn't exist yet.
+    Memory-maps initial_summaries_path (kept as analyzer._context_mm) so a
+    large summaries file isn't held resident as one big string; only the
+    excerpt used in each prompt is decoded. Returns a fallback message if
+    the file doesn't exist yet.
     """
     try:
-        with open(analyzer.initial_summaries_path, "r", encoding="utf-8") as f:
-            return f.read()
+        with open(analyzer.initial_summaries_path, "rb") as f:
+            analyzer._context_mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
     except FileNotFoundError:
         return "No summaries found. Please run analyze_project() first."
+    except ValueError:
+        return ""  # empty file; zero-length files can't be mapped
+    return analyzer._context_mm
+
+def context_excerpt(
+    context: mmap.mmap or str,
+    head: int = CHAT_CONTEXT_HEAD_CHARS,
+    tail: int = CHAT_CONTEXT_TAIL_CHARS
+) -> str:
+    """
+    Head/tail excerpt of the chat context, which is either a str or a
+    memory-mapped file. For mapped files head/tail count bytes and only
+    those two slices are decoded.
+    """
+    if isinstance(context, str):
+        return truncate_middle(context, head, tail)
+    if len(context) <= head + tail:
+        return context[:].decode("utf-8", "replace")
+    # "ignore" drops a multi-byte character split at either cut
+    return (
+        f"{context[:head].decode('utf-8', 'ignore')}\n...\n"
+        f"{context[-tail:].decode('utf-8', 'ignore')}"
+    )
+
+def compress_chat_history(chat_history: list, analyzer: ProjectAnalyzer) -> list:
+    """
+    Returns chat_history unchanged while it is within MAX_CHAT_TURNS;
+    otherwise folds the older turns into a single (CHAT_HISTORY_MARKER,
+    summary) entry followed by the most recent turns.
+    """
+    if len(chat_history) <= MAX_CHAT_TURNS:
+        return chat_history
+
+    keep = MAX_CHAT_TURNS // 2
+    older, recent = chat_history[:-keep], chat_history[-keep:]
+    older_text = "".join(
+        f"\nUser: {user_msg}\nAssistant: {bot_msg}" for user_msg, bot_msg in older
+    )
+    compressed = analyzer._generate_text(
+        cacheable=False,
+        system_prompt="You are an AI assistant that condenses conversations.",
+        user_prompt=(
+            f"Conversation:{older_text}\n\n"
+            "Compress this conversation into 5 bullet points, keeping any facts "
+            "about the code that later questions may rely on."
+        ),
+        max_new_tokens=CHAT_SUMMARY_NEW_TOKENS
+    )
+    if not compressed:
+        logging.warning("Could not compress chat history; dropping older turns")
+        return recent
+    return [(CHAT_HISTORY_MARKER, compressed)] + recent
 
 def chatbot_predict(
     message: str,
     chat_history: list,
     analyzer: ProjectAnalyzer,
-    context_summary: str
+    context_summary: mmap.mmap or str
 ) -> tuple[str, list]:
     """
     Builds a conversation from chat_history + current user message,
     calls generate_text() with 'context_summary' as part of the system prompt,
-    and appends the result to chat_history.
+    and appends the result to chat_history. Long histories are compressed
+    in place and the context is truncated so the prompt size stays bounded,
+    so chat_history is the model-facing history, not what the UI displays.
     """
-    conversation_text = ""
-    for turn in chat_history:
-        user_msg, bot_msg = turn
-        conversation_text += f"\nUser: {user_msg}\nAssistant: {bot_msg}"
+    chat_history[:] = compress_chat_history(chat_history, analyzer)
+    context_summary = context_excerpt(context_summary)
 
-    conversation_text += f"\nUser: {message}\nAssistant:"
+    parts = [
+        f"\nUser: {user_msg}\nAssistant: {bot_msg}"
+        for user_msg, bot_msg in chat_history
+    ]
+    parts.append(f"\nUser: {message}\nAssistant:")
+    conversation_text = "".join(parts)
 
     system_prompt = (
         "You are an AI assistant that knows the following code summary:\n"
@@ -378,14 +1484,11 @@ def chatbot_predict(
         "Current conversation:\n"
     )
 
-    answer = generate_text(
-        token=analyzer.token,
+    answer = analyzer._generate_text(
         system_prompt=system_prompt,
         user_prompt=conversation_text,
-        region_endpoint=analyzer.region_endpoint,
-        project_id=analyzer.project_id,
-        model_id=analyzer.model_id
-    ) or "No response received."
+        cacheable=False
+    ) or NO_RESPONSE
 
     chat_history.append((message, answer))
     return answer, chat_history
@@ -412,17 +1515,22 @@ def start_chatbot(analyzer: ProjectAnalyzer):
         msg = gr.Textbox(label="Your question:")
         clear_btn = gr.Button("Clear Conversation")
 
-        state = gr.State([])
+        state = gr.State([])  # every turn, as displayed
+        prompt_state = gr.State([])  # what the model sees; compressed when long
 
-        def on_submit(user_input, history):
-            response, updated_history = chatbot_predict(
-                user_input, history, analyzer, context_summary
+        def on_submit(user_input, history, prompt_history):
+            response, prompt_history = chatbot_predict(
+                user_input, prompt_history, analyzer, context_summary
             )
-            return "", updated_history, updated_history
+            history = history + [(user_input, response)]
+            return "", history, history, prompt_history
 
-        msg.submit(on_submit, [msg, state], [msg, state, chatbot])
+        msg.submit(
+            on_submit, [msg, state, prompt_state], [msg, state, chatbot, prompt_state]
+        )
         clear_btn.click(lambda: [], None, chatbot)
         clear_btn.click(lambda: [], None, state)
+        clear_btn.click(lambda: [], None, prompt_state)
 
         demo.launch(server_name="0.0.0.0", server_port=7860, share=False)
 
@@ -443,20 +1551,24 @@ def parse_args():
         action="store_true",
         help="Launch a local chatbot after analysis."
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore cached summaries/responses and query Watsonx for everything."
+    )
     return parser.parse_args()
 
 def main():
     args = parse_args()
-    analyzer = ProjectAnalyzer(project_dir=args.targetFolder)
-
-    analyzer.analyze_project()
-    analyzer.generate_developer_guide()
+    with ProjectAnalyzer(project_dir=args.targetFolder, use_cache=not args.no_cache) as analyzer:
+        analyzer.analyze_project()
+        analyzer.generate_developer_guide()
 
-    if args.chatbot:
-        logging.info("Starting local chatbot UI on http://localhost:7860 ...")
-        start_chatbot(analyzer)
-    else:
-        logging.info("Analysis complete. Rerun with --chatbot to start an interactive UI.")
+        if args.chatbot:
+            logging.info("Starting local chatbot UI on http://localhost:7860 ...")
+            start_chatbot(analyzer)
+        else:
+            logging.info("Analysis complete. Rerun with --chatbot to start an interactive UI.")
 
 if __name__ == "__main__":
     main()